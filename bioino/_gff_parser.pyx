@@ -0,0 +1,40 @@
+# cython: language_level=3
+"""Compiled per-line parser for GFF3 records.
+
+Built automatically when Cython and a C toolchain are available.
+`bioino.gff` falls back to an identical pure-Python implementation
+when this module has not been compiled.
+
+"""
+
+from bioino.gff import GffAttributes
+
+
+def parse_line(str line):
+
+    """Parse one tab-delimited GFF record into columns and attributes.
+
+    Returns a tuple of the eight column values (start and end as int)
+    and a dictionary of the column 9 attributes.
+
+    """
+
+    cdef list data = line.split('\t', 8)
+    cdef str col9, kv, key, sep, value
+    cdef tuple columns
+    cdef dict attributes = GffAttributes()
+
+    columns = (data[0], data[1], data[2],
+               int(data[3]), int(data[4]),
+               data[5], data[6], data[7])
+
+    col9 = data[8] if len(data) > 8 else ''
+
+    for kv in col9.split(';'):
+
+        if '=' in kv:
+
+            key, sep, value = kv.partition('=')
+            attributes[key] = value
+
+    return columns, attributes
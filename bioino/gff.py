@@ -4,21 +4,47 @@ Makes an attempt to conform to GFF3 but makes no guarantees.
 
 """
 
-from typing import TextIO, Union
-from collections import defaultdict, namedtuple
+from typing import Optional, TextIO, Union
+from collections import namedtuple
 from collections.abc import Generator, Iterable, Mapping, Sequence
+from functools import lru_cache
+from itertools import chain
+from urllib.parse import unquote
+import array
 import csv
 import io
 import sys
 
+import numpy as np
+
+try:  # JIT-compile the position-offset arithmetic when numba is available
+
+    from numba import njit as _njit
+
+except ImportError:
+
+    def _njit(*args, **kwargs):
+
+        def decorator(f):
+            return f
+
+        return decorator
+
 _GFF_COLNAMES = ('seqid', 'source', 'feature', 
                 'start', 'end', 'score', 
                 'strand', 'phase', 'attribute')
+_GFF_COL_FIELDS = frozenset(_GFF_COLNAMES[:-1])
 _GFF_FEATURE_BLOCKLIST = ('region', 'repeat_region')
+_WRITE_BUFFER_LINES = 8192
+
+@lru_cache(maxsize=1024)
+def _format_attributes(items: tuple) -> str:
+
+    return ';'.join(f'{key}={val}' for key, val in items)
+
 
 _GffLine = namedtuple('_GffLine', 'metadata columns attributes')
 _GffMetadatum = namedtuple('GffMetadatum', 'name flag values')
-_GffColumns = namedtuple('GffColumns', _GFF_COLNAMES[:-1])
 
 class GffLine(_GffLine):
 
@@ -39,6 +65,8 @@ class GffLine(_GffLine):
         Make a copy.
     __str__
         Show the GFF-formatted line.
+    __bytes__
+        Show the GFF-formatted line as encoded bytes.
 
     Examples
     --------
@@ -63,9 +91,38 @@ class GffLine(_GffLine):
 
         """Show the GFF-formatted line."""
 
-        _attributes = ';'.join([f'{key}={val}' for key, val in self.attributes.items()])
+        attributes = self.attributes
+
+        if 'offset' in attributes:
+
+            # lookup tables repeat the same attributes at every position
+            # with only `offset` varying, so cache the invariant prefix
+            items = tuple((key, val) for key, val in attributes.items()
+                          if key != 'offset')
+
+            try:
+
+                prefix = _format_attributes(items)
 
-        return (str(self.columns) + '\t' + _attributes + '\n')
+            except TypeError:  # unhashable attribute values can't be cached
+
+                prefix = ';'.join(f'{key}={val}' for key, val in items)
+
+            _attributes = (f"{prefix};offset={attributes['offset']}" if prefix
+                           else f"offset={attributes['offset']}")
+
+        else:
+
+            _attributes = ';'.join(f'{key}={val}'
+                                   for key, val in attributes.items())
+
+        return f"{self.columns}\t{_attributes}\n"
+
+    def __bytes__(self) -> bytes:
+
+        """Show the GFF-formatted line as encoded bytes."""
+
+        return str(self).encode()
 
 
 class GffMetadatum(_GffMetadatum):
@@ -107,10 +164,14 @@ class GffMetadatum(_GffMetadatum):
                 '\t'.join(map(str, self.values)))
         
 
-class GffColumns(_GffColumns):
+class GffColumns:
 
-    """Named tuple which gives a GFF-formatted metadata 
-    line when printed.
+    """Slotted record which gives a GFF-formatted line of
+    columns 1-8 when printed.
+
+    Keeps the `_fields`, `_asdict` and `_replace` API of the
+    namedtuple it replaces, but allows in-place assignment and
+    uses less memory per record.
 
     See GFF-format documentation for full description of
     attributes.
@@ -145,7 +206,65 @@ class GffColumns(_GffColumns):
     NC_000913.3 GenBank exon    1       100     .       +       .
 
     """
-    
+
+    __slots__ = _GFF_COLNAMES[:-1]
+
+    _fields = _GFF_COLNAMES[:-1]
+
+    def __init__(self,
+                 seqid, source, feature,
+                 start, end, score,
+                 strand, phase):
+
+        self.seqid = seqid
+        self.source = source
+        self.feature = feature
+        self.start = start
+        self.end = end
+        self.score = score
+        self.strand = strand
+        self.phase = phase
+
+    def __iter__(self):
+
+        return iter((self.seqid, self.source, self.feature,
+                     self.start, self.end, self.score,
+                     self.strand, self.phase))
+
+    def __eq__(self, other) -> bool:
+
+        if isinstance(other, (GffColumns, tuple)):
+
+            return tuple(self) == tuple(other)
+
+        return NotImplemented
+
+    def __hash__(self) -> int:
+
+        return hash(tuple(self))
+
+    def __repr__(self) -> str:
+
+        fields = ', '.join(f'{name}={getattr(self, name)!r}'
+                           for name in self._fields)
+
+        return f'GffColumns({fields})'
+
+    def _asdict(self) -> Mapping:
+
+        """Return the columns as a dictionary."""
+
+        return dict(zip(self._fields, self))
+
+    def _replace(self, **kwargs) -> 'GffColumns':
+
+        """Make a copy, replacing the given fields."""
+
+        d = self._asdict()
+        d.update(kwargs)
+
+        return GffColumns(**d)
+
     def __str__(self) -> str:
 
         """Show the GFF-formatted columns."""
@@ -153,14 +272,72 @@ class GffColumns(_GffColumns):
         return '\t'.join(map(str, self))
 
 
+class GffAttributes(dict):
+
+    """Attribute dictionary which URL-decodes percent-encoded
+    values lazily, on access.
+
+    GFF3 requires literal ';', '=' and other special characters in
+    attribute values to be percent-encoded. Decoding every value
+    while parsing would slow the hot read path, so it is deferred
+    until a value is looked up by key. The stored values keep their
+    percent-encoded form, so iteration and `items()` — and therefore
+    `str`/`write_gff` output — round-trip exactly what was parsed.
+
+    Examples
+    --------
+    >>> attributes = GffAttributes(Name='geneA', product='thiamine%3B kinase')
+    >>> attributes['product']
+    'thiamine; kinase'
+    >>> attributes['Name']
+    'geneA'
+    >>> dict(attributes)
+    {'Name': 'geneA', 'product': 'thiamine%3B kinase'}
+
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+
+        value = super().__getitem__(key)
+
+        if isinstance(value, str) and '%' in value:
+
+            return unquote(value)
+
+        return value
+
+
 def _get_gff_attributes(x: str) -> Mapping:
 
-    splits_on_equal_sign = tuple(item.split(';') for item in x.split('='))
-    
-    attributes = (item[-1] for item in splits_on_equal_sign)
-    values = (item[0] for item in splits_on_equal_sign[1:])
-    
-    return dict(zip(attributes, values))
+    """Parse a GFF3 attribute string with plain splits.
+
+    Attributes must be `key=value` pairs separated by ';'. Values may
+    contain literal '=', but a literal ';' must be percent-encoded as
+    the GFF3 spec requires; percent-encoded values are decoded lazily
+    by the returned `GffAttributes`.
+
+    """
+
+    return GffAttributes(kv.split('=', 1) for kv in x.split(';') if '=' in kv)
+
+
+try:  # compiled parser built by setup.py when Cython is available
+
+    from ._gff_parser import parse_line as _parse_gff_line
+
+except ImportError:
+
+    def _parse_gff_line(line: str) -> tuple:
+
+        data = line.split('\t', 8)
+        columns = (data[0], data[1], data[2],
+                   int(data[3]), int(data[4]),
+                   data[5], data[6], data[7])
+        col9 = data[8] if len(data) > 8 else ''
+
+        return columns, _get_gff_attributes(col9)
 
 
 def read_gff(file: Union[str, TextIO]) -> Generator[GffLine]:
@@ -179,7 +356,7 @@ def read_gff(file: Union[str, TextIO]) -> Generator[GffLine]:
     ------
     GffLine
         Named tuple containing metadata, columns, attributes fields.
-    metadata : list
+    metadata : tuple
         GffMetadatum objects in the same order as the GFF header.
     columns : GffColumns
         Named tuple of columns 1 to 8 of the GFF.
@@ -188,13 +365,12 @@ def read_gff(file: Union[str, TextIO]) -> Generator[GffLine]:
 
     Examples
     --------
-    >>> list(read_gff('''
-    ...     ##meta1 item1
-    ...     #meta2  item2   comment
-    ...     test_seq    test_source gene    1   10  .   +   .   ID=test01;attr1=+
-    ...     test_seq    test_source gene    9   100  .   +   .   Parent=test01;attr2=+
-    ...     '''))
-    [GffLine(metadata=[GffMetadatum(name='meta1 item1', flag='constrained', values=()), GffMetadatum(name='meta2  item2   comment', flag='free', values=())], columns=GffColumns(seqid='test_seq', source='test_source', feature='gene', start=1, end=10, score='.', strand='+', phase='.'), attributes={'ID': 'test01', 'attr1': '+'}), GffLine(metadata=[GffMetadatum(name='meta1 item1', flag='constrained', values=()), GffMetadatum(name='meta2  item2   comment', flag='free', values=())], columns=GffColumns(seqid='test_seq', source='test_source', feature='gene', start=9, end=100, score='.', strand='+', phase='.'), attributes={'Parent': 'test01', 'attr2': '+'})]
+    >>> gff = ("##meta1\\titem1\\n"
+    ...        "#meta2\\titem2\\tcomment\\n"
+    ...        "test_seq\\ttest_source\\tgene\\t1\\t10\\t.\\t+\\t.\\tID=test01;attr1=+\\n"
+    ...        "test_seq\\ttest_source\\tgene\\t9\\t100\\t.\\t+\\t.\\tParent=test01;attr2=+\\n")
+    >>> list(read_gff(gff))
+    [GffLine(metadata=(GffMetadatum(name='meta1', flag='constrained', values=('item1',)), GffMetadatum(name='meta2', flag='free', values=('item2', 'comment'))), columns=GffColumns(seqid='test_seq', source='test_source', feature='gene', start=1, end=10, score='.', strand='+', phase='.'), attributes={'ID': 'test01', 'attr1': '+'}), GffLine(metadata=(GffMetadatum(name='meta1', flag='constrained', values=('item1',)), GffMetadatum(name='meta2', flag='free', values=('item2', 'comment'))), columns=GffColumns(seqid='test_seq', source='test_source', feature='gene', start=9, end=100, score='.', strand='+', phase='.'), attributes={'Parent': 'test01', 'attr2': '+'})]
 
     
     """
@@ -203,43 +379,190 @@ def read_gff(file: Union[str, TextIO]) -> Generator[GffLine]:
         file = io.StringIO(file)
 
     metadata = []
+    frozen_metadata = None
 
     for line in file:
 
-        line = line.strip()
+        line = line.rstrip()
 
-        if line.startswith('#'):  # header
+        if not line:
 
-            flag = 'constrained' if line.startswith('##') else 'free'
-            this_metadata = line.lstrip('#').lstrip().split('\t')
-            
-            metadata.append(GffMetadatum(name=this_metadata[0], 
-                                         flag=flag, 
+            continue
+
+        if line[0] == '#':  # header or mid-file directive
+
+            flag = ('constrained' if len(line) > 1 and line[1] == '#'
+                    else 'free')
+            this_metadata = line.lstrip('#').split('\t')
+
+            metadata.append(GffMetadatum(name=this_metadata[0],
+                                         flag=flag,
                                          values=tuple(this_metadata[1:])))
+            frozen_metadata = None  # re-freeze below to include this line
+
+        else:  # tab-delimited table
 
-        elif len(line) > 0:  # tab-delimited table
+            if frozen_metadata is None:  # freeze so records share one tuple
+
+                frozen_metadata = tuple(metadata)
 
-            data = line.split()
-            
             try:
-                
-                columns = GffColumns(*data[:8])
-            
-            except TypeError as e:
-                
+
+                columns, attributes = _parse_gff_line(line)
+
+            except (IndexError, ValueError) as e:
+
                 sys.stderr.write('\n!!! ERROR: Probably corrupted file. '
                                  'Here\'s the last line read:'
                                  '\n\n{}\n\n'.format(line))
-                
+
                 raise e
-            
-            columns = columns._replace(start=int(columns.start),
-                                       end=int(columns.end))
-            col9 = '\t'.join(data[8:])
 
-            attributes = _get_gff_attributes(col9)
+            yield GffLine(frozen_metadata, GffColumns(*columns), attributes)
+
+
+def read_gff_columnar(file: Union[str, TextIO]) -> Mapping:
+
+    """Read a GFF file into columnar arrays.
+
+    Returns one column per GFF field in structure-of-arrays layout:
+    start and end coordinates as int64 numpy arrays, the string
+    columns as lists, and the attributes as a list of dictionaries.
+    This is far more compact than one record object per line and
+    suits vectorised range queries over many records at once.
+
+    Parameters
+    ----------
+    file: TextIO
+        String or file handle such as one generated by `open(f, mode='r')`.
+
+    Returns
+    -------
+    dict
+        Mapping from GFF column name to a column of values.
+
+    Examples
+    --------
+    >>> gff = ("chr\\tsrc\\tgene\\t4\\t6\\t.\\t+\\t.\\tName=geneA\\n"
+    ...        "chr\\tsrc\\tgene\\t10\\t12\\t.\\t+\\t.\\tName=geneB\\n")
+    >>> columns = read_gff_columnar(gff)
+    >>> columns['start']
+    array([ 4, 10])
+    >>> columns['seqid']
+    ['chr', 'chr']
+    >>> columns['attribute']
+    [{'Name': 'geneA'}, {'Name': 'geneB'}]
+
+    """
+
+    starts, ends = array.array('q'), array.array('q')
+    seqids, sources, features = [], [], []
+    scores, strands, phases = [], [], []
+    attributes = []
+
+    for gff_line in read_gff(file):
+
+        columns = gff_line.columns
+
+        seqids.append(columns.seqid)
+        sources.append(columns.source)
+        features.append(columns.feature)
+        starts.append(columns.start)
+        ends.append(columns.end)
+        scores.append(columns.score)
+        strands.append(columns.strand)
+        phases.append(columns.phase)
+        attributes.append(gff_line.attributes)
+
+    return dict(seqid=seqids,
+                source=sources,
+                feature=features,
+                start=np.frombuffer(starts, dtype=np.int64),
+                end=np.frombuffer(ends, dtype=np.int64),
+                score=scores,
+                strand=strands,
+                phase=phases,
+                attribute=attributes)
+
+
+def read_gff_bulk(path: str) -> 'polars.DataFrame':
+
+    """Read a whole GFF file into a polars DataFrame.
+
+    Uses the multithreaded native CSV parser from polars, which is much
+    faster than `read_gff` for analytics workloads such as filtering
+    and joining annotations. The attribute column is kept as a plain
+    string; use `bulk2gff` to recover `GffLine` objects when the
+    streaming API is needed.
+
+    Requires the optional polars dependency, installable with
+    `pip install bioino[bulk]`.
+
+    Parameters
+    ----------
+    path : str
+        Path to a GFF file.
+
+    Returns
+    -------
+    polars.DataFrame
+        Table with one row per GFF record and one column per GFF field.
+
+    Examples
+    --------
+    >>> df = read_gff_bulk('annotations.gff')  # doctest: +SKIP
+    >>> df.filter(pl.col('feature') == 'gene')  # doctest: +SKIP
+
+    """
+
+    try:
+
+        import polars as pl
+
+    except ImportError as e:
+
+        raise ImportError('read_gff_bulk requires polars. '
+                          'Install it with `pip install bioino[bulk]`.') from e
+
+    return pl.read_csv(path,
+                       separator='\t',
+                       comment_prefix='#',
+                       has_header=False,
+                       new_columns=list(_GFF_COLNAMES),
+                       schema_overrides={'start': pl.Int64,
+                                         'end': pl.Int64})
+
+
+def bulk2gff(df: 'polars.DataFrame') -> Generator[GffLine]:
+
+    """Convert a DataFrame from `read_gff_bulk` to a stream of GffLines.
+
+    Attribute strings are only parsed here, row by row, so bulk tables
+    can be filtered cheaply before paying the per-record cost.
+
+    Parameters
+    ----------
+    df : polars.DataFrame
+        Table as produced by `read_gff_bulk`.
+
+    Yields
+    ------
+    GffLine
+        Named tuple containing metadata, columns, attributes fields.
+
+    Examples
+    --------
+    >>> write_gff(bulk2gff(read_gff_bulk('annotations.gff')))  # doctest: +SKIP
+
+    """
+
+    metadata = ()
+
+    for row in df.iter_rows():
 
-            yield GffLine(metadata, columns, attributes)
+        yield GffLine(metadata,
+                      GffColumns(*row[:8]),
+                      _get_gff_attributes(row[8] or ''))
 
 
 def write_gff(stream: Sequence[GffLine],
@@ -281,81 +604,203 @@ def write_gff(stream: Sequence[GffLine],
 
     """
 
+    raw = getattr(file, 'buffer', None)
+
+    if raw is None:
+
+        write = file.write
+
+    else:  # pre-encode each chunk and skip the TextIO layer
+
+        encoding = file.encoding or 'utf-8'
+        file.flush()
+
+        def write(chunk):
+
+            raw.write(chunk.encode(encoding))
+
+    buffer = []
+
     for i, line in enumerate(stream):
 
         if metadata and i == 0:
 
-            file.write('\n'.join(map(str, line.metadata)) + '\n')
+            buffer.append('\n'.join(map(str, line.metadata)) + '\n')
 
-        file.write(str(line))
+        buffer.append(str(line))
+
+        if len(buffer) >= _WRITE_BUFFER_LINES:
+
+            write(''.join(buffer))
+            buffer.clear()
+
+    if len(buffer) > 0:
+
+        write(''.join(buffer))
 
     return None
 
 
-def _gapfill_table(gff_line: GffLine, 
-                   last_feature: GffLine = None) -> Mapping:
+class PositionLookup:
+
+    """Mapping from genomic position to annotated features.
+
+    Stores one feature index and one offset per position in numpy
+    arrays (structure-of-arrays layout) and materialises `GffLine`
+    objects only on lookup, so a whole chromosome costs a few bytes
+    per position rather than a list and a dict entry each.
+
+    Indexing by position returns a list of GffLine objects, as the
+    dictionary-of-lists it replaces did. Positions written more than
+    once (overlapping features) resolve to the feature written last.
+
+    Examples
+    --------
+    >>> gff = ("chr\\tsrc\\tgene\\t4\\t6\\t.\\t+\\t.\\tName=geneA\\n"
+    ...        "chr\\tsrc\\tgene\\t10\\t12\\t.\\t+\\t.\\tName=geneB\\n")
+    >>> table = lookup_table(read_gff(gff))
+    >>> table[5][0].attributes
+    {'Name': 'geneA', 'offset': 1}
+    >>> table[9][0].attributes
+    {'Name': 'geneB', 'locus_tag': '_up-geneB', 'offset': 1}
+
+    """
+
+    __slots__ = ('feature_idx', 'offset', 'features')
+
+    def __init__(self):
+
+        self.feature_idx = np.full(1024, -1, dtype=np.int32)
+        self.offset = np.zeros(1024, dtype=np.int32)
+        self.features = []
+
+    def _grow(self, n: int) -> None:
+
+        size = self.feature_idx.shape[0]
+
+        if n > size:
+
+            new_size = max(n, 2 * size)
+
+            feature_idx = np.full(new_size, -1, dtype=np.int32)
+            feature_idx[:size] = self.feature_idx
+            self.feature_idx = feature_idx
+
+            offset = np.zeros(new_size, dtype=np.int32)
+            offset[:size] = self.offset
+            self.offset = offset
+
+    def _add_feature(self, feature: GffLine) -> int:
 
-    lookup_table = defaultdict(list)
+        self.features.append(feature)
+
+        return len(self.features) - 1
+
+    def _fill(self,
+              start: int,
+              stop: int,
+              feature_idx: int,
+              offsets: np.ndarray) -> None:
+
+        self._grow(stop)
+        self.feature_idx[start:stop] = feature_idx
+        self.offset[start:stop] = offsets
+
+    def __getitem__(self, i: int) -> Sequence:
+
+        idx = self.feature_idx[i]
+
+        if idx < 0:
+            return []
+
+        feature = self.features[idx]
+
+        return [feature._replace(attributes=(feature.attributes |
+                                             dict(offset=int(self.offset[i]))))]
+
+    def __contains__(self, i) -> bool:
+
+        return 0 <= i < self.feature_idx.shape[0] and self.feature_idx[i] >= 0
+
+    def __iter__(self):
+
+        return iter(np.flatnonzero(self.feature_idx >= 0).tolist())
+
+    def __len__(self) -> int:
+
+        return int((self.feature_idx >= 0).sum())
+
+
+def _offset_anchor(columns: GffColumns) -> tuple:
+
+    # origin and direction for a feature's offsets, computed once per
+    # feature rather than once per position
+    if columns.strand == '+':
+        return columns.start, 1
+
+    return columns.end, -1
+
+
+@_njit(cache=True)
+def _position_offsets(start: int,
+                      stop: int,
+                      origin: int,
+                      sign: int) -> np.ndarray:
+
+    return (np.arange(start, stop, dtype=np.int64) - origin) * sign
+
+
+def _gapfill_table(table: PositionLookup,
+                   gff_line: GffLine,
+                   last_feature: GffLine = None) -> None:
 
     this_start = gff_line.columns.start
 
     if last_feature is None:
 
         last_end = 0
-        intergenic0 = gff_line.copy()
-    
+        intergenic0 = gff_line
+
     else:
 
         last_end = last_feature.columns.end
-        intergenic0 = last_feature.copy()
+        intergenic0 = last_feature
 
-    intergenic1 = gff_line.copy()
+    # _replace below builds fresh records from the attr0/attr1 copies,
+    # so aliasing the incoming lines is safe
+    intergenic1 = gff_line
 
     gap_span = (this_start - 1) - (last_end + 1)
     gap_midpoint = last_end + 1 + gap_span // 2
     
-    if intergenic0.columns.strand == '+':
-        pre_mid_offset_start = intergenic0.columns.start
-        pre_mid_sign = 1.
-        pre_mid_prefix = '_down-' if last_feature is not None else '_up-' 
-    else:
-        pre_mid_offset_start = intergenic0.columns.end
-        pre_mid_sign = -1.
-        pre_mid_prefix = '_up-' if last_feature is not None else '_down-' 
-
-    if intergenic1.columns.strand == '+':
-        post_mid_offset_start = intergenic1.columns.start
-        post_mid_sign = -1.
-        post_mid_prefix = '_up-'
+    pre_mid_offset_start, pre_mid_sign = _offset_anchor(intergenic0.columns)
+
+    if pre_mid_sign > 0:
+        pre_mid_prefix = '_down-' if last_feature is not None else '_up-'
     else:
-        post_mid_offset_start = intergenic1.columns.end
-        post_mid_sign = 1.
-        post_mid_prefix = '_down-'
+        pre_mid_prefix = '_up-' if last_feature is not None else '_down-'
 
-    attr0 = intergenic0.attributes.copy() 
+    post_mid_offset_start, post_mid_sign = _offset_anchor(intergenic1.columns)
+    post_mid_sign = -post_mid_sign
+    post_mid_prefix = '_up-' if post_mid_sign < 0 else '_down-'
+
+    attr0 = intergenic0.attributes.copy()
     attr0 |= dict(locus_tag=pre_mid_prefix + attr0['Name'])
-    attr1 = intergenic1.attributes.copy() 
+    attr1 = intergenic1.attributes.copy()
     attr1 |= dict(locus_tag=post_mid_prefix + attr1['Name'])
-    # print(attr1)
 
     # fill in the gap
-    for i in range(last_end + 1, gap_midpoint + 1):
-
-        offset = (i - pre_mid_offset_start) * pre_mid_sign
-        # attr0.update(dict(offset=int(offset)))
-        this_intergenic = intergenic0._replace(attributes=(attr0 | dict(offset=int(offset))))
-
-        lookup_table[i].append(this_intergenic)
+    idx0 = table._add_feature(intergenic0._replace(attributes=attr0))
+    table._fill(last_end + 1, gap_midpoint + 1, idx0,
+                _position_offsets(last_end + 1, gap_midpoint + 1,
+                                  pre_mid_offset_start, pre_mid_sign))
 
-    for i in range(gap_midpoint + 1, this_start):
+    idx1 = table._add_feature(intergenic1._replace(attributes=attr1))
+    table._fill(gap_midpoint + 1, this_start, idx1,
+                _position_offsets(gap_midpoint + 1, this_start,
+                                  post_mid_offset_start, post_mid_sign))
 
-        offset = (i - post_mid_offset_start) * post_mid_sign
-        # attr1.update(dict(offset=int(offset)))
-        this_intergenic = intergenic1._replace(attributes=(attr1 | dict(offset=int(offset))))
-
-        lookup_table[i].append(this_intergenic)
-
-    return lookup_table
+    return None
 
 
 def lookup_table(gff_stream: Iterable[GffLine]) -> Mapping:
@@ -381,64 +826,52 @@ def lookup_table(gff_stream: Iterable[GffLine]) -> Mapping:
 
     Returns
     -------
-    dict
-        Dictionary mapping chromosome location to feature annotation.
+    PositionLookup
+        Mapping from chromosome location to feature annotation.
 
     """.format(', '.join(_GFF_FEATURE_BLOCKLIST))
 
-    lookup_table = defaultdict(list)
+    table = PositionLookup()
 
-    last_feature = None 
+    last_feature = None
 
     for gff_line in gff_stream:
 
-        if (gff_line.columns.feature not in _GFF_FEATURE_BLOCKLIST and 
+        if (gff_line.columns.feature not in _GFF_FEATURE_BLOCKLIST and
             'Name' in gff_line.attributes and
             'Parent' not in gff_line.attributes):
-                
-            gap_table = _gapfill_table(gff_line, 
-                                       last_feature)
-            
-            lookup_table |= gap_table
 
-            offset_start = (gff_line.columns.start 
-                            if gff_line.columns.strand == '+' 
-                            else gff_line.columns.end)
+            _gapfill_table(table, gff_line, last_feature)
 
-            for i in range(gff_line.columns.start, 
-                           gff_line.columns.end + 1):
+            this_start = gff_line.columns.start
+            this_end = gff_line.columns.end
+            offset_start, _ = _offset_anchor(gff_line.columns)
 
-                offset =  abs(i - offset_start)
-                this_gff_line = gff_line.copy()
-                this_gff_line.attributes['offset'] = offset
+            idx = table._add_feature(gff_line)
+            table._fill(this_start, this_end + 1, idx,
+                        np.abs(_position_offsets(this_start, this_end + 1,
+                                                 offset_start, 1)))
 
-                lookup_table[i].append(this_gff_line)
+            last_feature = gff_line
 
-            last_feature = gff_line.copy()
+    last_offset_start, last_sign = _offset_anchor(last_feature.columns)
+    last_prefix = '_down-' if last_sign > 0 else '_up-'
 
-    if last_feature.columns.strand == '+':
-        last_offset_start = last_feature.columns.start
-        last_sign = 1.
-        last_prefix = '_down-'
-    else:
-        last_offset_start = last_feature.columns.end
-        last_sign = -1.
-        last_prefix = '_up-'
-
-    attr = last_feature.attributes.copy() 
+    attr = last_feature.attributes.copy()
     attr |= dict(locus_tag=last_prefix + attr['Name'])
 
-    for i in range(last_feature.columns.end, 
-                   last_feature.columns.end + 1000):
-
-        offset = (i - last_offset_start) * last_sign
-        last_feature = last_feature._replace(attributes=(attr.copy() | dict(offset=int(offset))))
-
-        lookup_table[i].append(last_feature)
+    last_end = last_feature.columns.end
+    idx = table._add_feature(last_feature._replace(attributes=attr))
+    table._fill(last_end, last_end + 1000, idx,
+                _position_offsets(last_end, last_end + 1000,
+                                  last_offset_start, last_sign))
 
-    assert all(len(lookup_table[i]) > 0 for i in range(1, max(lookup_table) + 1))
+    # positions 1..max are all covered iff the number of filled
+    # positions equals the highest filled position
+    filled = np.flatnonzero(table.feature_idx >= 0)
+    assert filled.size == int(filled[-1])
 
-    return lookup_table
+    return table
 
 
 def dict2gff(x: Mapping, 
@@ -474,12 +907,16 @@ def dict2gff(x: Mapping,
 
     """
 
-    columns = GffColumns(**{key: value for key, value in x.items() 
-                            if key in GffColumns._fields})
-    attributes = {key: x[key] for key in sorted(x) 
-                  if key not in GffColumns._fields}
+    columns = {}
+    attributes = {}
 
-    return GffLine(metadata, columns, attributes)
+    for key, value in x.items():
+
+        (columns if key in _GFF_COL_FIELDS else attributes)[key] = value
+
+    return GffLine(metadata,
+                   GffColumns(**columns),
+                   dict(sorted(attributes.items())))
 
 
 def gff2dict(gff_stream: Iterable[GffLine]) -> Generator[Mapping]:
@@ -501,7 +938,7 @@ def gff2dict(gff_stream: Iterable[GffLine]) -> Generator[Mapping]:
 
     Examples
     --------
-    >>> line = "TEST    test    gene    1       100     .       +       +       ID=test001;comment=Test"
+    >>> line = "TEST\\ttest\\tgene\\t1\\t100\\t.\\t+\\t+\\tID=test001;comment=Test"
     >>> list(gff2dict(read_gff(line)))  # doctest: +NORMALIZE_WHITESPACE
     [{'seqid': 'TEST', 'source': 'test', 'feature': 'gene', 'start': 1, 'end': 100, 'score': '.', 'strand': '+', 'phase': '+', 'ID': 'test001', 'comment': 'Test'}]    
     
@@ -518,13 +955,19 @@ def gff2dict(gff_stream: Iterable[GffLine]) -> Generator[Mapping]:
 def gff2csv(gff_stream: Iterable[GffLine],
             file: TextIO = sys.stdout,
             write_metadata: bool = False,
-            sep=',') -> None:
-    
+            sep=',',
+            known_attributes: Optional[Sequence[str]] = None) -> None:
+
     """Converts a stream of GFFLines to a delimited stream.
 
-    The resulting table has columns for the GFF columns 1-8 and 
+    The resulting table has columns for the GFF columns 1-8 and
     each of the unique attributes from the whole stream.
-    
+
+    If `known_attributes` is given, the attribute columns are taken
+    from it and records are written as they arrive, so arbitrarily
+    large streams can be converted in constant memory. Otherwise the
+    stream is buffered once to discover the attribute schema.
+
     Parameters
     ----------
     gff_stream : Iterable[GffLine]
@@ -535,6 +978,9 @@ def gff2csv(gff_stream: Iterable[GffLine],
         Whether to write metadata header. Default: False.
     sep : str, optional
         Delimiter between fields. Default: ','.
+    known_attributes : Sequence[str], optional
+        Attribute columns to write. Attributes not listed are dropped.
+        Default: discover attributes by buffering the whole stream.
 
     Raises
     ------
@@ -548,10 +994,8 @@ def gff2csv(gff_stream: Iterable[GffLine],
     Examples
     --------
     >>> from io import StringIO
-    >>> line = '''
-    ... TEST    test    gene    1       100     .       +       +       ID=test001;comment=Test
-    ... TEST    test    gene    121       120     .       +       -       ID=test001;tag=test_tag
-    ... '''
+    >>> line = ("TEST\\ttest\\tgene\\t1\\t100\\t.\\t+\\t+\\tID=test001;comment=Test\\n"
+    ...         "TEST\\ttest\\tgene\\t121\\t120\\t.\\t+\\t-\\tID=test001;tag=test_tag\\n")
     >>> gff2csv(read_gff(line))  # doctest: +SKIP
     seqid,source,feature,start,end,score,strand,phase,ID,comment,tag
     TEST,test,gene,1,100,.,+,+,test001,Test,
@@ -563,30 +1007,45 @@ def gff2csv(gff_stream: Iterable[GffLine],
     
     """
 
-    gff_lines = tuple(gff_stream)
-    attribute_keys = set()
-    main_cols, metadata = None, None
+    gff_stream = iter(gff_stream)
 
-    for i, gff_line in enumerate(gff_lines):
+    try:
 
-        if i == 0:
-            main_cols = gff_line.columns._fields
-            metadata = gff_line.metadata
-        
-        attribute_keys |= (set(gff_line.attributes))
+        first = next(gff_stream)
+
+    except StopIteration:
 
-    if main_cols is None:
         raise IOError('GFF stream is empty.')
 
+    main_cols = first.columns._fields
+    metadata = first.metadata
+
+    if known_attributes is None:
+
+        gff_lines = [first] + list(gff_stream)
+        attribute_keys = set()
+
+        for gff_line in gff_lines:
+
+            attribute_keys |= set(gff_line.attributes)
+
+        attribute_keys = sorted(attribute_keys)
+
+    else:
+
+        gff_lines = chain((first, ), gff_stream)
+        attribute_keys = list(known_attributes)
+
     if write_metadata:
-        
+
         file.write(str(metadata))
 
     writer = csv.DictWriter(file,
-                            fieldnames=list(main_cols) + list(sorted(attribute_keys)),
-                            delimiter=sep)
+                            fieldnames=list(main_cols) + list(attribute_keys),
+                            delimiter=sep,
+                            extrasaction='ignore')
     writer.writeheader()
-    
+
     for gff_line in gff2dict(gff_lines):
 
         writer.writerow(gff_line)
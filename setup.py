@@ -0,0 +1,21 @@
+"""Build script for optional compiled extensions.
+
+All metadata lives in pyproject.toml. This only adds the Cython
+extension for the GFF line parser when Cython is installed; the
+package is fully functional as pure Python without it.
+
+"""
+
+from setuptools import setup
+
+try:
+
+    from Cython.Build import cythonize
+    ext_modules = cythonize(['bioino/_gff_parser.pyx'],
+                            language_level=3)
+
+except ImportError:
+
+    ext_modules = []
+
+setup(ext_modules=ext_modules)